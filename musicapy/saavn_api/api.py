@@ -1,7 +1,22 @@
 from . import services, utils
+from .endpoint import Transport
 
 
-class SaavnAPI(services.SearchService, services.SongService, services.AlbumService, services.PlaylistService, utils.Utils):
+class SaavnAPI(services.SearchService, services.SongService, services.AlbumService, services.ArtistService, services.PlaylistService, utils.Utils):
     ''' :class:`SaavnAPI` class inherits all the services of the JioSaavn API
-    used to search, get details and lyrics of songs and album'''
-    pass
+    used to search, get details and lyrics of songs, albums and artists.
+
+    Each instance carries its own :class:`musicapy.saavn_api.endpoint.Transport`
+    (base url, connections, timeout, cache and limits), instances can be
+    shared between threads.
+
+    :param transport: :class:`musicapy.saavn_api.endpoint.Transport` object
+    used to send requests. If `None`, new transport is created using
+    `transport_options`
+    :param transport_options: keyword arguments passed to
+    :class:`musicapy.saavn_api.endpoint.Transport`, e.g. `base_url`,
+    `timeout`, `cache`, `max_concurrency`
+    '''
+
+    def __init__(self, transport: Transport = None, **transport_options):
+        self.transport = transport if transport is not None else Transport(**transport_options)
@@ -3,11 +3,10 @@ headers = {
     'Accept': 'application/json, text/plain, */*',
     'Cache-Control': 'no-cache',
     'User-Agent': "Mozilla/5.0 (X11; Linux x86_64; rv:100.0) Gecko/20100101 Firefox/100.0",
-    'Accept-Encoding': 'gzip, deflate, br',
+    'Accept-Encoding': 'gzip, deflate',
     'Accept-Language': 'en-US,en;q=0.5',
     'Cache-Control': 'max-age=0',
     'Connection': 'keep-alive',
-    'Host': 'www.jiosaavn.com',
             'Sec-Fetch-Dest': 'document',
             'Sec-Fetch-Mode': 'navigate',
             'Sec-Fetch-Site': 'cross-site',
@@ -28,11 +27,13 @@ api_types = {
     'songDetails': 'song.getDetails',
     'albumDetails': 'content.getAlbumDetails',
     'playlistDetails': 'playlist.getDetails',   # use v4, with listid={playlist_id:int}
+    'artistDetails': 'artist.getArtistPageDetails', # supports pagination (&page=0), number of albums (&n_album=50)
 
     # details by link
     'songDetailsByLink': 'webapi.get&type=song',
     'albumDetailsByLink': 'webapi.get&type=album',
     'playlistDetailsByLink': 'webapi.get&type=playlist', # supports pagination (&p=1), number of songs (&n=1000)
+    'artistDetailsByLink': 'webapi.get&type=artist', # supports pagination (&p=0), number of albums (&n_album=50)
 
     # misc
     'homeData': 'webapi.getLaunchData',
@@ -44,3 +45,25 @@ api_types = {
     # generate auth token
     'songAuthToken': 'song.generateAuthToken'   # need encrypted url which can be received from song details `encrypted_media_url` field
 }
+
+# request timeout in seconds
+timeout = 30
+
+# send duplicate request when request takes longer than `percentile` latency
+# of recent requests, `budget` is max ratio of hedged requests
+hedging = {
+    'enabled': False,
+    'percentile': 95,
+    'window': 200,
+    'min_samples': 20,
+    'budget': 0.1,
+    'workers': 16,
+}
+
+# fail fast with `CircuitOpenError` after `failure_threshold` consecutive
+# failures of an api type, for `recovery_timeout` seconds
+circuit_breaker = {
+    'enabled': False,
+    'failure_threshold': 5,
+    'recovery_timeout': 30,
+}
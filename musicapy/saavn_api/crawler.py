@@ -0,0 +1,402 @@
+from json import dumps as dump_JSON_str, loads as load_JSON
+from multiprocessing import get_context
+from os import getpid
+from os.path import isfile
+from queue import Empty
+
+from .api import SaavnAPI
+from .state import JSONStateStore
+from .utils import Utils
+
+
+def get_task_key(task: list) -> str:
+    '''Creates unique key for crawler task
+
+    :param task: list value containing task type and its arguments, e.g.
+    `['album', '1234']`. Song tasks are keyed by song id only
+
+    :return: task key
+    :rtype: str
+    '''
+    if task[0] == 'song':
+        task = task[:2]
+    return ':'.join(map(str, task))
+
+
+def extract_artist_albums(artist_details: dict) -> list:
+    '''Extracts albums list from artist details fetched using
+    `ArtistService.get_artist_details`
+
+    :param artist_details: dict value containing artist details
+
+    :return: list of albums
+    :rtype: list
+    '''
+    albums = artist_details.get('topAlbums') or []
+    if isinstance(albums, dict):
+        albums = albums.get('albums') or []
+    return albums
+
+
+def process_task(task: list, client, albums_per_page: int = 50) -> tuple:
+    '''Processes single crawler task
+
+    :param task: list value containing task type and its arguments
+    :param client: :class:`musicapy.saavn_api.api.SaavnAPI` object used to
+    fetch data
+    :param albums_per_page: int value, number of albums fetched on single
+    artist page
+
+    :return: tuple of (records, new tasks). records is a list of dicts to be
+    written to the output and new tasks is a list of tasks to be crawled
+    :rtype: tuple
+    '''
+    task_type = task[0]
+
+    if task_type == 'artistName':
+        # resolve artist name to id using first search result
+        data = client.search_artist(task[1], limit=1)
+        results = (data or {}).get('results') or []
+        if not results:
+            raise ValueError(f'artist {task[1]} not found')
+        return [], [['artist', results[0].get('id'), 0]]
+
+    if task_type == 'artist':
+        _, artist_id, page = task
+        details = client.get_artist_details(
+            {'type': 'id', 'value': artist_id}, page=page, n_album=albums_per_page)
+        if not details:
+            raise ValueError(f'artist {artist_id} details not found')
+
+        albums = extract_artist_albums(details)
+        new_tasks = [['album', album.get('id')] for album in albums if album.get('id')]
+
+        # artist has more albums on next page
+        if len(albums) >= albums_per_page:
+            new_tasks.append(['artist', artist_id, page + 1])
+
+        records = []
+        if page == 0:
+            records.append({
+                'kind': 'artist',
+                'id': artist_id,
+                'name': details.get('name'),
+                'image': details.get('image'),
+                'perma_url': details.get('urls', {}).get('overview') or details.get('perma_url'),
+            })
+        return records, new_tasks
+
+    if task_type == 'album':
+        album_id = task[1]
+        # song details are fetched by song tasks, so songs shared between
+        # albums are fetched only once
+        details = client.get_album_details({'type': 'id', 'value': album_id}, fetch_songs=False)
+        if not details:
+            raise ValueError(f'album {album_id} details not found')
+
+        songs = [song for song in details.pop('songs', []) if song and song.get('id')]
+        details['kind'] = 'album'
+        details['song_ids'] = [song.get('id') for song in songs]
+
+        new_tasks = [['song', song.get('id'), song.get('perma_url')] for song in songs]
+        return [details], new_tasks
+
+    if task_type == 'song':
+        _, song_id, perma_url = task
+        details = client.get_song_details(Utils.create_identifier(perma_url, 'song'))
+        if not details:
+            raise ValueError(f'song {song_id} details not found')
+
+        details['kind'] = 'song'
+        return [details], []
+
+    raise ValueError(f'unknown task type {task_type}')
+
+
+def crawler_worker(tasks, results, client_factory=SaavnAPI, albums_per_page: int = 50):
+    '''Crawler worker process, reads tasks from the shared tasks queue. Puts
+    `('start', pid, task)` to results queue before processing a task and
+    `('done', pid, task, records, new_tasks, error)` after it. Stops on
+    receiving `None` task.
+
+    :param tasks: multiprocessing Queue containing tasks
+    :param results: multiprocessing Queue for results
+    :param client_factory: callable returning
+    :class:`musicapy.saavn_api.api.SaavnAPI` object, called once in the
+    worker process, so connections are not shared with other processes
+    :param albums_per_page: int value, number of albums fetched on single
+    artist page
+    '''
+    client = client_factory()
+    pid = getpid()
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+
+        results.put(('start', pid, task))
+        try:
+            records, new_tasks = process_task(task, client, albums_per_page)
+            results.put(('done', pid, task, records, new_tasks, None))
+        except Exception as e:
+            results.put(('done', pid, task, [], [], f'{type(e).__name__}: {e}'))
+
+
+class DiscographyCrawler:
+    ''':class:`DiscographyCrawler` crawls albums and songs of artists using
+    pool of worker processes and streams them to NDJSON file. Albums and
+    songs shared between artists and albums are crawled only once. Finished
+    tasks are appended to journal file (`<checkpoint_floc>.journal`), which
+    is compacted into checkpoint file every `compact_every` tasks, so crawl
+    can be resumed after crash. Records written after the last journal flush
+    may be written again on resume. Tasks of workers which die unexpectedly
+    are queued again and the worker is replaced.
+
+    :param out_floc: str value, location of the output NDJSON file. Records
+    are appended to the file
+    :param checkpoint_floc: str value, location of the checkpoint JSON file
+    :param workers: int value, number of worker processes, default value 4
+    :param albums_per_page: int value, number of albums fetched on single
+    artist page, default value 50
+    :param checkpoint_every: int value, number of finished tasks after which
+    journal is flushed to disk, default value 20
+    :param client_factory: picklable callable returning
+    :class:`musicapy.saavn_api.api.SaavnAPI` object, e.g.
+    `functools.partial(SaavnAPI, base_url=...)`. Each worker creates its own
+    client, default value :class:`musicapy.saavn_api.api.SaavnAPI`
+    :param max_task_crashes: int value, number of worker crashes after which
+    task is marked as failed, default value 3
+    :param compact_every: int value, number of finished tasks after which
+    journal is compacted into checkpoint file, default value 10000
+    '''
+
+    # seconds to wait for results before checking workers are alive
+    poll_interval = 5
+
+    def __init__(self, out_floc: str, checkpoint_floc: str, workers: int = 4,
+                 albums_per_page: int = 50, checkpoint_every: int = 20,
+                 client_factory=SaavnAPI, max_task_crashes: int = 3,
+                 compact_every: int = 10000):
+        self.out_floc = out_floc
+        self.workers = workers
+        self.albums_per_page = albums_per_page
+        self.checkpoint_every = checkpoint_every
+        self.client_factory = client_factory
+        self.max_task_crashes = max_task_crashes
+        self.compact_every = compact_every
+        self.journal_floc = f'{checkpoint_floc}.journal'
+        self.checkpoint = JSONStateStore(checkpoint_floc)
+
+    def crawl(self, artists: list) -> dict:
+        '''Crawls discography of artists
+
+        :param artists: list of artist names (str) or artist ids (int)
+
+        :return: dict containing crawl stats, i.e. `tasks`, `records` and
+        `failed` tasks with errors
+        :rtype: dict
+        '''
+        done, pending, failed_tasks = self.__load_checkpoint()
+        failed = {}
+
+        # retry previously failed tasks
+        pending.update(failed_tasks)
+        failed_tasks.clear()
+
+        for artist in artists:
+            task = ['artist', str(artist), 0] if isinstance(artist, int) else ['artistName', artist]
+            key = get_task_key(task)
+            if key not in done:
+                pending[key] = task
+
+        stats = {'tasks': 0, 'records': 0, 'failed': failed}
+        if not pending:
+            return stats
+
+        # replayed journal and new artists are saved to checkpoint
+        self.__compact(done, pending, failed_tasks)
+
+        ctx = get_context()
+        tasks_queue = ctx.Queue()
+        results_queue = ctx.Queue()
+        processes = {}
+        in_progress = {}    # pid -> task being processed by worker
+        crashes = {}        # task key -> number of worker crashes
+
+        def start_worker():
+            process = ctx.Process(
+                target=crawler_worker,
+                args=(tasks_queue, results_queue, self.client_factory, self.albums_per_page),
+                daemon=True)
+            process.start()
+            processes[process.pid] = process
+
+        for _ in range(self.workers):
+            start_worker()
+
+        for task in pending.values():
+            tasks_queue.put(task)
+
+        def fail_task(key, error):
+            failed[key] = error
+            failed_tasks[key] = pending.pop(key)
+            journal.write(dump_JSON_str({'failed': failed_tasks[key]}) + '\n')
+
+        try:
+            with open(self.out_floc, 'a') as out, open(self.journal_floc, 'a') as journal:
+                while pending:
+                    try:
+                        message = results_queue.get(timeout=self.poll_interval)
+                    except Empty:
+                        # requeue tasks of dead workers and replace them
+                        for pid, process in list(processes.items()):
+                            if process.is_alive():
+                                continue
+                            del processes[pid]
+                            task = in_progress.pop(pid, None)
+                            key = get_task_key(task) if task is not None else None
+                            if key in pending:
+                                crashes[key] = crashes.get(key, 0) + 1
+                                if crashes[key] >= self.max_task_crashes:
+                                    fail_task(key, f'worker crashed {crashes[key]} times')
+                                else:
+                                    tasks_queue.put(task)
+                            start_worker()
+
+                        # worker died before its task was reported, nothing
+                        # is running but tasks are left, queue them again
+                        if not in_progress and tasks_queue.empty():
+                            for key, task in list(pending.items()):
+                                crashes[key] = crashes.get(key, 0) + 1
+                                if crashes[key] >= self.max_task_crashes:
+                                    fail_task(key, f'task lost {crashes[key]} times')
+                                else:
+                                    tasks_queue.put(task)
+                        continue
+
+                    if message[0] == 'start':
+                        _, pid, task = message
+                        in_progress[pid] = task
+                        continue
+
+                    _, pid, task, records, new_tasks, error = message
+                    in_progress.pop(pid, None)
+                    key = get_task_key(task)
+                    if key not in pending:
+                        continue
+                    stats['tasks'] += 1
+
+                    if error:
+                        fail_task(key, error)
+                    else:
+                        for record in records:
+                            out.write(dump_JSON_str(record) + '\n')
+                            stats['records'] += 1
+
+                        pending.pop(key)
+                        done.add(key)
+                        added_tasks = []
+                        for new_task in new_tasks:
+                            new_key = get_task_key(new_task)
+                            if new_key in done or new_key in pending:
+                                continue
+                            pending[new_key] = new_task
+                            added_tasks.append(new_task)
+                            tasks_queue.put(new_task)
+                        journal.write(dump_JSON_str({'done': key, 'tasks': added_tasks}) + '\n')
+
+                    if stats['tasks'] % self.checkpoint_every == 0:
+                        # records are flushed before journal, so finished
+                        # tasks are never missing from output
+                        out.flush()
+                        journal.flush()
+                    if stats['tasks'] % self.compact_every == 0:
+                        out.flush()
+                        self.__compact(done, pending, failed_tasks, journal)
+        except BaseException:
+            # stop workers without processing remaining tasks, progress is
+            # kept in journal
+            self.__stop_workers(processes.values(), tasks_queue, results_queue)
+            raise
+
+        for _ in processes:
+            tasks_queue.put(None)
+        for process in processes.values():
+            process.join()
+
+        self.__compact(done, pending, failed_tasks)
+        return stats
+
+    @staticmethod
+    def __stop_workers(processes, tasks_queue, results_queue):
+        '''Drops queued tasks and terminates worker processes'''
+        try:
+            while True:
+                tasks_queue.get_nowait()
+        except Empty:
+            pass
+
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
+
+        # do not wait for queued data to be flushed on exit
+        tasks_queue.cancel_join_thread()
+        results_queue.cancel_join_thread()
+
+    def __load_checkpoint(self) -> tuple:
+        '''Loads crawl progress from checkpoint file and replays journal
+
+        :return: tuple of (done task keys, pending tasks, failed tasks),
+        pending and failed tasks are dicts of task key as key and task as
+        value
+        :rtype: tuple
+        '''
+        done = set(self.checkpoint.get('done', []))
+        pending = {get_task_key(task): task for task in self.checkpoint.get('pending', [])}
+        failed_tasks = {get_task_key(task): task for task in self.checkpoint.get('failed', [])}
+
+        if not isfile(self.journal_floc):
+            return done, pending, failed_tasks
+
+        with open(self.journal_floc) as journal:
+            for line in journal:
+                try:
+                    entry = load_JSON(line)
+                except ValueError:
+                    # last line may be partially written on crash
+                    break
+
+                if 'done' in entry:
+                    key = entry['done']
+                    done.add(key)
+                    pending.pop(key, None)
+                    failed_tasks.pop(key, None)
+                    for task in entry['tasks']:
+                        task_key = get_task_key(task)
+                        if task_key not in done:
+                            pending[task_key] = task
+                else:
+                    key = get_task_key(entry['failed'])
+                    pending.pop(key, None)
+                    failed_tasks[key] = entry['failed']
+
+        return done, pending, failed_tasks
+
+    def __compact(self, done: set, pending: dict, failed_tasks: dict, journal=None):
+        '''Saves crawl progress to checkpoint file and clears journal
+
+        :param journal: opened journal file, if `None` journal file is
+        truncated by opening it
+        '''
+        self.checkpoint.set('done', list(done), save=False)
+        self.checkpoint.set('pending', list(pending.values()), save=False)
+        self.checkpoint.set('failed', list(failed_tasks.values()), save=False)
+        self.checkpoint.save()
+
+        if journal is None:
+            open(self.journal_floc, 'w').close()
+        else:
+            journal.seek(0)
+            journal.truncate()
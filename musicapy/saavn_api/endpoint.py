@@ -1,7 +1,401 @@
 from . import config
+from .resilience import CircuitBreaker, HedgingBudget, LatencyTracker
 from .utils import Utils
-from requests import get as GET
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from copy import deepcopy
+from requests import Session
 from json import loads as load_JSON
+from threading import BoundedSemaphore, Event, Lock, Thread, local
+from time import monotonic
+
+
+class ResponseCache:
+    ''':class:`ResponseCache` is a thread safe LRU cache for API responses
+
+    :param maxsize: int value, max number of cached responses, default value
+    1024
+    :param ttl: int or float value, seconds after which cached response
+    expires, default value 300
+    '''
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key):
+        '''Returns copy of cached response
+
+        :param key: hashable value, cache key
+
+        :return: cached response, None if response is absent or expired
+        '''
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+
+            expires_at, value = item
+            if expires_at < monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+
+        return deepcopy(value)
+
+    def set(self, key, value):
+        '''Caches copy of response
+
+        :param key: hashable value, cache key
+        :param value: response to be cached
+        '''
+        value = deepcopy(value)
+        with self._lock:
+            self._data[key] = (monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        '''Removes all cached responses'''
+        with self._lock:
+            self._data.clear()
+
+
+class Transport:
+    ''':class:`Transport` sends requests to the JioSaavn API. Each transport
+    carries its own settings, connections, cache, latency history and circuit
+    breakers, so differently configured clients can be used in a single
+    process. Transport can be shared between threads, every thread uses its
+    own connection pool.
+
+    Settings which are not passed are read from :mod:`config` module on every
+    request.
+
+    :param base_url: str value, JioSaavn API base url
+    :param headers: dict value, headers sent with every request
+    :param timeout: int or float value, request timeout in seconds
+    :param session: `requests.Session` object shared by all threads. If
+    `None`, session is created for each thread
+    :param cache: :class:`ResponseCache` object used to cache responses. If
+    `None`, responses are not cached
+    :param max_concurrency: int value, max number of concurrent requests. If
+    `None`, requests are not limited
+    :param hedging: dict value, overrides `config.hedging` settings
+    :param circuit_breaker: dict value, overrides `config.circuit_breaker`
+    settings
+    '''
+
+    def __init__(self, base_url: str = None, headers: dict = None,
+                 timeout: float = None, session: Session = None,
+                 cache: ResponseCache = None, max_concurrency: int = None,
+                 hedging: dict = None, circuit_breaker: dict = None):
+        self._base_url = base_url
+        self._timeout = timeout
+        self._hedging = hedging or {}
+        self._circuit_breaker = circuit_breaker or {}
+        self._headers = headers
+        self.session = session
+        self.cache = cache
+
+        self._semaphore = BoundedSemaphore(max_concurrency) if max_concurrency else None
+        self._local = local()
+        self._lock = Lock()
+        self._latency_trackers = {}
+        self._circuit_breakers = {}
+        self._hedging_budget = None
+        self._hedging_executor = None
+
+    @property
+    def base_url(self) -> str:
+        return self._base_url if self._base_url is not None else config.base_url
+
+    @property
+    def headers(self) -> dict:
+        return self._headers if self._headers is not None else config.headers
+
+    @property
+    def timeout(self) -> float:
+        return self._timeout if self._timeout is not None else config.timeout
+
+    @property
+    def hedging(self) -> dict:
+        return {**config.hedging, **self._hedging}
+
+    @property
+    def circuit_breaker(self) -> dict:
+        return {**config.circuit_breaker, **self._circuit_breaker}
+
+    def get_session(self) -> Session:
+        '''Returns session of the current thread
+
+        :return: session used to send requests
+        :rtype: requests.Session
+        '''
+        if self.session is not None:
+            return self.session
+
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = Session()
+            self._local.session = session
+        return session
+
+    def get_endpoint(self, api: str, is_version_4: bool = True, include_meta_tags: bool = False) -> str:
+        '''Get endpoint url
+
+        :param api: str value, api call from apis.saavnAPI.config module
+        :param is_version_4: bool value, if True uses API version 4, else
+        ignores it
+
+        :return: str value containing JioSaavn API endpoint
+        :rtype: str
+        '''
+        return f'{self.base_url}{"&api_version=4" if is_version_4 else ""}{"&includeMetaTags=0" if include_meta_tags else ""}&__call={api}'
+
+    def get_latency_tracker(self, api_type: str) -> LatencyTracker:
+        '''Returns latency tracker of the api type
+
+        :param api_type: str value containing Saavn api method from
+        apis.saavnAPI.config module
+
+        :return: latency tracker of recent requests of api type
+        :rtype: LatencyTracker
+        '''
+        tracker = self._latency_trackers.get(api_type)
+        if tracker is None:
+            hedging = self.hedging
+            with self._lock:
+                tracker = self._latency_trackers.setdefault(
+                    api_type, LatencyTracker(hedging['window'], hedging['min_samples']))
+        return tracker
+
+    def get_circuit_breaker(self, api_type: str) -> CircuitBreaker or None:
+        '''Returns circuit breaker of the api type
+
+        :param api_type: str value containing Saavn api method from
+        apis.saavnAPI.config module
+
+        :return: circuit breaker of api type, None if circuit breaker is
+        disabled
+        :rtype: CircuitBreaker or None
+        '''
+        settings = self.circuit_breaker
+        if not settings['enabled']:
+            return None
+
+        breaker = self._circuit_breakers.get(api_type)
+        if breaker is None:
+            with self._lock:
+                breaker = self._circuit_breakers.setdefault(
+                    api_type, CircuitBreaker(api_type, settings['failure_threshold'],
+                                             settings['recovery_timeout']))
+        return breaker
+
+    def request(self, method: str, url: str, sent: Event = None,
+                session: Session = None, **kwargs):
+        '''Sends HTTP request using transport settings, i.e. session,
+        headers, timeout and concurrency limit. Used for API requests as well
+        as download links. Streamed responses (`stream=True`) hold concurrency
+        slot until the response is closed, so they should be used as context
+        managers.
+
+        :param method: str value, HTTP method, e.g. `GET` or `HEAD`
+        :param url: str value, request url
+        :param sent: `threading.Event` object set when request is sent, i.e.
+        after waiting for concurrency limit, default value `None`
+        :param session: `requests.Session` object used to send request. If
+        `None`, session of the current thread is used
+        :param kwargs: keyword arguments passed to `requests.Session.request`
+
+        :return: response of the request
+        :rtype: requests.Response
+        '''
+        kwargs.setdefault('headers', self.headers)
+        kwargs.setdefault('timeout', self.timeout)
+
+        if self._semaphore is not None:
+            self._semaphore.acquire()
+
+        is_held = False
+        try:
+            if sent is not None:
+                sent.set()
+            session = session if session is not None else self.get_session()
+            res = session.request(method, url, **kwargs)
+
+            # body of streamed response is downloaded after returning, slot
+            # is released when response is closed
+            if kwargs.get('stream') and self._semaphore is not None:
+                res.close = self.__release_on_close(res.close)
+                is_held = True
+            return res
+        finally:
+            if self._semaphore is not None and not is_held:
+                self._semaphore.release()
+
+    def __release_on_close(self, close):
+        '''Wraps close method of response, so concurrency slot is released
+        once when response is closed'''
+        lock = Lock()
+        is_released = False
+
+        def release_on_close():
+            nonlocal is_released
+            try:
+                close()
+            finally:
+                with lock:
+                    should_release = not is_released
+                    is_released = True
+                if should_release:
+                    self._semaphore.release()
+
+        return release_on_close
+
+    def send_request(self, endpoint: str, params: dict, tracker: LatencyTracker = None,
+                     sent: Event = None, session: Session = None):
+        '''Sends HTTP GET request and records its latency, time spent waiting
+        for concurrency limit is not recorded
+
+        :param endpoint: str value containing JioSaavn API endpoint
+        :param params: dict value containing query key-value pairs
+        :param tracker: latency tracker of the api type, default value `None`
+        :param sent: `threading.Event` object set when request is sent, i.e.
+        after waiting for concurrency limit, default value `None`
+        :param session: `requests.Session` object used to send request. If
+        `None`, session of the current thread is used
+
+        :return: response of the request
+        :rtype: requests.Response
+        '''
+        res = self.request('GET', endpoint, sent=sent, session=session, params=params)
+
+        if tracker is not None:
+            tracker.add(res.elapsed.total_seconds())
+        return res
+
+    def send_hedged_request(self, endpoint: str, params: dict, tracker: LatencyTracker):
+        '''Sends HTTP GET request, if response is not received within
+        configured latency percentile then sends duplicate request and returns
+        whichever response is received first. Only duplicate requests use the
+        hedging thread pool, their number is limited by hedging budget.
+
+        :param endpoint: str value containing JioSaavn API endpoint
+        :param params: dict value containing query key-value pairs
+        :param tracker: latency tracker of the api type
+
+        :return: response of the request
+        :rtype: requests.Response
+        '''
+        hedging = self.hedging
+        if self._hedging_executor is None:
+            with self._lock:
+                if self._hedging_executor is None:
+                    self._hedging_budget = HedgingBudget(hedging['budget'])
+                    self._hedging_executor = ThreadPoolExecutor(
+                        max_workers=hedging['workers'])
+        self._hedging_budget.record_request()
+
+        # primary request is sent on its own thread, so it never waits for
+        # hedging workers, and hedge delay starts when it is actually sent
+        sent = Event()
+        primary = Future()
+        Thread(target=self.__run_request,
+               args=(primary, endpoint, params, tracker, sent, self.get_session()),
+               daemon=True).start()
+        futures = [primary]
+        delay = tracker.percentile(hedging['percentile'])
+
+        sent.wait()
+        done, _ = wait(futures, timeout=delay)
+        if not done and self._hedging_budget.try_acquire():
+            futures.append(self._hedging_executor.submit(self.send_request, endpoint, params, tracker))
+
+        # return first successful response, raise error if all requests failed
+        pending = futures
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+
+        return futures[0].result()
+
+    def __run_request(self, future: Future, endpoint: str, params: dict,
+                      tracker: LatencyTracker, sent: Event, session: Session):
+        '''Sends request using caller's session and sets its response or
+        error to future'''
+        try:
+            future.set_result(self.send_request(endpoint, params, tracker, sent, session))
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            sent.set()
+
+    def get_data(self, api_type: str = '', params: dict = None, use_v4: bool = True, ) -> dict or bool:
+        '''Sends HTTP GET request to the Saavn API server and returns data in
+        python dict format
+
+        :param api_type: str value containing Saavn api method from
+        apis.saavnAPI.config module
+        :param params: dict value containing query key-value pairs
+        :param use_v4: bool value. If True uses API v4 else ignores it.
+        default value `True`
+
+        :return: returns a dict containing data else returns False if any
+        status code is not 200
+        :rtype: dict or bool
+
+        :raises CircuitOpenError: if circuit breaker is enabled and api type
+        is failing
+        '''
+        cache_key = None
+        if self.cache is not None:
+            cache_key = (api_type, use_v4, tuple(sorted((params or {}).items())))
+            data = self.cache.get(cache_key)
+            if data is not None:
+                return data
+
+        endpoint = self.get_endpoint(config.api_types[api_type], use_v4)
+        tracker = self.get_latency_tracker(api_type)
+        breaker = self.get_circuit_breaker(api_type)
+
+        if breaker:
+            breaker.before_request()
+
+        try:
+            if self.hedging['enabled']:
+                res = self.send_hedged_request(endpoint, params, tracker)
+            else:
+                res = self.send_request(endpoint, params, tracker)
+        except Exception:
+            if breaker:
+                breaker.record_failure()
+            raise
+
+        if breaker:
+            if res.status_code >= 500 or res.status_code == 429:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+
+        data = False
+
+        if 200 <= res.status_code < 300:
+            data = load_JSON(res.text)
+            Utils.remove_unused_keys(data)
+
+            if cache_key is not None:
+                self.cache.set(cache_key, data)
+
+        return data
+
+
+# transport used by module level functions and static style service calls
+default_transport = Transport()
 
 
 def get_endpoint(api: str, is_version_4: bool = True, include_meta_tags: bool = False) -> str:
@@ -14,12 +408,36 @@ def get_endpoint(api: str, is_version_4: bool = True, include_meta_tags: bool =
     :return: str value containing JioSaavn API endpoint
     :rtype: str
     '''
-    return f'{config.base_url}{"&api_version=4" if is_version_4 else ""}{"&includeMetaTags=0" if include_meta_tags else ""}&__call={api}'
+    return default_transport.get_endpoint(api, is_version_4, include_meta_tags)
+
+
+def get_latency_tracker(api_type: str) -> LatencyTracker:
+    '''Returns latency tracker of the api type of default transport
+
+    :param api_type: str value containing Saavn api method from apis.saavnAPI.
+    config module
+
+    :return: latency tracker of recent requests of api type
+    :rtype: LatencyTracker
+    '''
+    return default_transport.get_latency_tracker(api_type)
+
+
+def get_circuit_breaker(api_type: str) -> CircuitBreaker or None:
+    '''Returns circuit breaker of the api type of default transport
+
+    :param api_type: str value containing Saavn api method from apis.saavnAPI.
+    config module
+
+    :return: circuit breaker of api type, None if circuit breaker is disabled
+    :rtype: CircuitBreaker or None
+    '''
+    return default_transport.get_circuit_breaker(api_type)
 
 
 def get_data(api_type: str = '', params: dict = None, use_v4: bool = True, ) -> dict or bool:
-    '''Sends HTTP GET request to the Saavn API server and returns data in
-    python dict format
+    '''Sends HTTP GET request to the Saavn API server using default transport
+    and returns data in python dict format
 
     :param api_type: str value containing Saavn api method from apis.saavnAPI.
     config module
@@ -30,13 +448,8 @@ def get_data(api_type: str = '', params: dict = None, use_v4: bool = True, ) ->
     :return: returns a dict containing data else returns False if any status
     code is not 200
     :rtype: dict or bool
+
+    :raises CircuitOpenError: if circuit breaker is enabled and api type is
+    failing
     '''
-    endpoint = get_endpoint(config.api_types[api_type], use_v4)
-    res = GET(endpoint, params=params)
-    data = False
-    
-    if 200 <= res.status_code < 300:
-        data = load_JSON(res.text)
-        Utils.remove_unused_keys(data)
-
-    return data
+    return default_transport.get_data(api_type, params, use_v4)
@@ -0,0 +1,170 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from .services import AlbumService
+
+
+def extract_albums(data: dict or list) -> list:
+    '''Extracts albums list from data fetched using
+    `AlbumService.get_new_albums`
+
+    :param data: dict or list value containing new albums
+
+    :return: list of albums
+    :rtype: list
+    '''
+    if isinstance(data, list):
+        return data
+    if not data:
+        return []
+    return data.get('data') or data.get('albums') or []
+
+
+class NewReleasesFeed:
+    ''':class:`NewReleasesFeed` incrementally consumes new released albums.
+    Pages are fetched until an already seen album is found. Ids of latest
+    seen albums (high-water mark) are saved in store, so each poll fetches
+    only new albums. Next page is prefetched while current page is processed.
+    If high-water mark is not reached within `max_pages`, position of the
+    poll is saved in store as `<key>:cursor` and next polls continue from it,
+    so albums in the gap are fetched without fetching same pages again.
+
+    :param store: :class:`musicapy.saavn_api.state.JSONStateStore` object or
+    any object with `get` and `set` methods used to save high-water mark
+    :param page_size: int value, number of albums on a single page, default
+    value 50
+    :param max_pages: int value, max number of pages fetched in single poll,
+    default value 10
+    :param workers: int value, number of threads used to prefetch pages and
+    expand albums, default value 8
+    :param key: str value, key of the high-water mark in store, default value
+    `new_releases`
+    :param watermark_size: int value, number of latest album ids kept in
+    high-water mark, default value 200
+    :param client: :class:`musicapy.saavn_api.api.SaavnAPI` object used to
+    fetch albums. If `None`, default client is used
+    '''
+
+    def __init__(self, store, page_size: int = 50, max_pages: int = 10,
+                 workers: int = 8, key: str = 'new_releases',
+                 watermark_size: int = 200, client=None):
+        self.client = client if client is not None else AlbumService
+        self.store = store
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.workers = workers
+        self.key = key
+        self.cursor_key = f'{key}:cursor'
+        self.watermark_size = watermark_size
+
+    def poll(self, expand: bool = False, max_pages: int = None) -> dict:
+        '''Fetches albums released since the last poll. Albums released after
+        the last poll are fetched first, then the gap left by truncated polls
+        is fetched starting from the saved cursor.
+
+        :param expand: bool value. If True fetches album details along with
+        songs for new albums concurrently, default value `False`
+        :param max_pages: int value, overrides max number of pages fetched in
+        this poll, default value `None`
+
+        :return: dict containing `albums` (new albums), `pages` (number of
+        fetched pages), `truncated` (True if high-water mark was not reached,
+        remaining albums are fetched by next polls) and `error` (True if
+        fetching a page failed)
+        :rtype: dict
+        '''
+        max_pages = max_pages if max_pages is not None else self.max_pages
+        seen_ids = self.store.get(self.key) or []
+        seen = set(seen_ids)
+        cursor = self.store.get(self.cursor_key)
+        cursor_ids = cursor['ids'] if cursor else []
+
+        polled = set(cursor_ids)
+        new_albums = []
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            # albums released since the last poll
+            stop_id, next_page, pages, error = self.__fetch_albums(
+                executor, 1, max_pages, seen | polled, polled, new_albums)
+            head_count = len(new_albums)
+
+            if cursor and stop_id is not None and stop_id not in seen:
+                # reached albums of truncated poll, continue from its cursor
+                if pages < max_pages:
+                    stop_id, next_page, resumed_pages, error = self.__fetch_albums(
+                        executor, cursor['page'], cursor['page'] + max_pages - pages - 1,
+                        seen, polled, new_albums)
+                    pages += resumed_pages
+                else:
+                    next_page = cursor['page']
+
+            if expand and new_albums:
+                new_albums = list(executor.map(self.__expand_album, new_albums))
+
+        new_ids = [album.get('id') or album.get('albumid') for album in new_albums]
+        # newest albums first, then albums of truncated polls and the gap
+        ids = new_ids[:head_count] + cursor_ids + new_ids[head_count:]
+
+        # first poll starts from the latest albums, older ones are not fetched
+        is_complete = (not seen_ids and not cursor) or (not error and next_page is None)
+        if is_complete:
+            if ids:
+                self.store.set(self.key, (ids + seen_ids)[:self.watermark_size])
+            if cursor:
+                self.store.set(self.cursor_key, None)
+        elif new_albums:
+            self.store.set(self.cursor_key, {'page': next_page, 'ids': ids})
+
+        return {'albums': new_albums, 'pages': pages, 'truncated': not is_complete, 'error': error}
+
+    def __fetch_albums(self, executor, page: int, last_page: int, stop_ids: set,
+                       polled: set, new_albums: list) -> tuple:
+        '''Fetches pages from page to last_page until album from stop_ids is
+        found, albums not present in polled are appended to new_albums. Next
+        page is prefetched while current page is processed.
+
+        :return: tuple of (found album id or None, next page to be fetched or
+        None if there are no more albums, number of fetched pages, True if
+        fetching a page failed)
+        :rtype: tuple
+        '''
+        pages = 0
+        future = executor.submit(self.client.get_new_albums, page, self.page_size)
+        try:
+            while True:
+                data = future.result()
+                future = None
+                if data is False or data is None:
+                    return None, page, pages, True
+
+                albums = extract_albums(data)
+                pages += 1
+                has_more = len(albums) >= self.page_size
+                if has_more and page < last_page:
+                    future = executor.submit(self.client.get_new_albums, page + 1, self.page_size)
+
+                for album in albums:
+                    album_id = album.get('id') or album.get('albumid')
+                    if album_id in stop_ids:
+                        return album_id, None, pages, False
+
+                    # pages may shift while polling, skip repeated albums
+                    if album_id in polled:
+                        continue
+                    polled.add(album_id)
+                    new_albums.append(album)
+
+                if not has_more:
+                    return None, None, pages, False
+                if future is None:
+                    return None, page + 1, pages, False
+                page += 1
+        finally:
+            # prefetched page is not needed
+            if future is not None:
+                future.cancel()
+
+    def __expand_album(self, album: dict) -> dict:
+        '''Fetches album details along with songs, returns album itself if
+        details are not found'''
+        album_id = album.get('id') or album.get('albumid')
+        details = self.client.get_album_details({'type': 'id', 'value': album_id})
+        return details or album
@@ -0,0 +1,335 @@
+from hashlib import sha256
+from os import close, link as hardlink, makedirs, remove, replace, symlink
+from os.path import abspath, basename, getmtime, getsize, isdir, isfile, join, lexists, splitext
+from shutil import copyfile
+from tempfile import mkstemp
+from threading import Lock, RLock
+from time import time
+from urllib.parse import urlparse
+
+from .state import JSONStateStore
+
+import wget
+
+
+class MediaStore:
+    ''':class:`MediaStore` is a local store for downloaded songs keyed by song
+    id and bitrate. Each song is downloaded only once and then hardlinked (or
+    symlinked) into output locations. Index of the store is saved as JSON, so
+    lookups do not need network.
+
+    :param root: str value, directory where songs and index are stored
+    :param quota: int value, max size of the store in bytes. Least recently
+    used songs are removed when store grows over quota. If `None`, store size
+    is not limited
+    :param use_symlinks: bool value. If True creates symlinks instead of
+    hardlinks, default value `False`
+    :param flush_every: int value, number of index changes (added songs,
+    aliases and song access times) after which index is saved, default value
+    100. Call :meth:`flush` to save them explicitly
+    :param transport: :class:`musicapy.saavn_api.endpoint.Transport` object
+    used to download songs, e.g. `api.transport`. If `None`, songs are
+    downloaded using `wget`
+    '''
+
+    def __init__(self, root: str, quota: int = None, use_symlinks: bool = False,
+                 flush_every: int = 100, transport=None):
+        self.transport = transport
+        # symlink targets are resolved relative to the link, so absolute
+        # paths are stored
+        self.root = abspath(root)
+        self.quota = quota
+        self.use_symlinks = use_symlinks
+        self.flush_every = flush_every
+        self.objects_dir = join(self.root, 'objects')
+        makedirs(self.objects_dir, exist_ok=True)
+
+        self._lock = RLock()
+        self._inflight = {}
+        self._unsaved = 0
+        self._index = JSONStateStore(join(self.root, 'index.json'))
+
+    @staticmethod
+    def create_key(song_id: str, bitrate: str) -> str:
+        '''Creates index key for song
+
+        :param song_id: str value, song id
+        :param bitrate: str value, bitrate of the song, e.g. `320`
+
+        :return: index key
+        :rtype: str
+        '''
+        return f'song:{song_id}:{bitrate}'
+
+    def get_song_id(self, identifier: dict) -> str or None:
+        '''Returns song id saved for identifier
+
+        :param identifier: dictionary containing `type` and `value` as keys
+        containing type(id or link) and its value(pids or token) respectively
+        for JioSaavn API.
+
+        :return: song id if identifier is known else None
+        :rtype: str or None
+        '''
+        return self._index.get(f'alias:{identifier.get("type")}:{identifier.get("value")}')
+
+    def add_alias(self, identifier: dict, song_id: str):
+        '''Saves song id for identifier, used to skip song details lookup
+
+        :param identifier: dictionary containing `type` and `value` as keys
+        containing type(id or link) and its value(pids or token) respectively
+        for JioSaavn API.
+        :param song_id: str value, song id
+        '''
+        with self._lock:
+            self._index.set(f'alias:{identifier.get("type")}:{identifier.get("value")}', song_id, save=False)
+            self.__mark_unsaved()
+
+    def has(self, song_id: str, bitrate: str) -> bool:
+        '''Checks whether song is present in the store without using network
+
+        :param song_id: str value, song id
+        :param bitrate: str value, bitrate of the song
+
+        :return: True if song is present else False
+        :rtype: bool
+        '''
+        entry = self._index.get(self.create_key(song_id, bitrate))
+        return bool(entry) and isfile(entry['floc'])
+
+    def add(self, song_id: str, bitrate: str, url: str, transport=None) -> str:
+        '''Downloads song to the store if it is not present already. Songs
+        are downloaded concurrently, only downloads of the same song wait for
+        each other.
+
+        :param song_id: str value, song id
+        :param bitrate: str value, bitrate of the song
+        :param url: str value, download link of the song
+        :param transport: :class:`musicapy.saavn_api.endpoint.Transport`
+        object used to download song instead of store transport, default
+        value `None`
+
+        :return: location of the song in the store
+        :rtype: str
+        '''
+        key = self.create_key(song_id, bitrate)
+        with self._lock:
+            # [lock, number of threads using it], lock is removed only when
+            # no other thread is waiting for it
+            inflight = self._inflight.setdefault(key, [Lock(), 0])
+            inflight[1] += 1
+
+        try:
+            with inflight[0]:
+                if self.has(song_id, bitrate):
+                    return self._index.get(key)['floc']
+
+                ext = splitext(urlparse(url).path)[1]
+                floc = join(self.objects_dir, f'{song_id}_{bitrate}{ext}')
+                fd, tmp_floc = mkstemp(suffix='.part', dir=self.objects_dir)
+                close(fd)
+                try:
+                    self.__download(url, tmp_floc, transport or self.transport)
+                    replace(tmp_floc, floc)
+                finally:
+                    if lexists(tmp_floc):
+                        remove(tmp_floc)
+                entry = {
+                    'floc': floc,
+                    'size': getsize(floc),
+                    'mtime': getmtime(floc),
+                    'sha256': self.checksum(floc),
+                    'last_access': time(),
+                }
+
+                with self._lock:
+                    self._index.set(key, entry, save=False)
+                    self.__mark_unsaved()
+                    self.evict(keep=key)
+        finally:
+            with self._lock:
+                inflight[1] -= 1
+                if not inflight[1]:
+                    del self._inflight[key]
+
+        return floc
+
+    def link(self, song_id: str, bitrate: str, floc: str) -> str or bool:
+        '''Links song from the store to floc. Song checksum is verified if
+        song file size or modification time differs from the index.
+
+        :param song_id: str value, song id
+        :param bitrate: str value, bitrate of the song
+        :param floc: str value, output file or directory location
+
+        :return: location of the linked file, False if song is not present in
+        the store or song file is corrupted
+        :rtype: str or bool
+        '''
+        key = self.create_key(song_id, bitrate)
+        if not self.has(song_id, bitrate):
+            return False
+
+        entry = self._index.get(key)
+        src = entry['floc']
+        if (getsize(src) != entry['size'] or getmtime(src) != entry.get('mtime')) \
+                and not self.verify(song_id, bitrate):
+            return False
+
+        if isdir(floc):
+            floc = join(floc, basename(src))
+        if lexists(floc):
+            remove(floc)
+
+        if self.use_symlinks:
+            symlink(src, floc)
+        else:
+            try:
+                hardlink(src, floc)
+            except OSError:
+                # hardlinks are not supported across file systems
+                copyfile(src, floc)
+
+        # access time is saved in batches to avoid rewriting index per link
+        with self._lock:
+            entry['last_access'] = time()
+            self._index.set(key, entry, save=False)
+            self.__mark_unsaved()
+
+        return floc
+
+    def save(self, song_details: dict, floc: str, bitrate: str = '320',
+             transport=None) -> str or bool:
+        '''Saves song to floc, downloads song only if it is not present in the
+        store or stored song is corrupted
+
+        :param song_details: dict value containing song details with
+        `download_links`, fetched using `SongService.get_song_details`
+        :param floc: str value, output file or directory location
+        :param bitrate: str value, bitrate of the song, default value 320
+        :param transport: :class:`musicapy.saavn_api.endpoint.Transport`
+        object used to download song instead of store transport, default
+        value `None`
+
+        :return: location of the saved file, False if download link is absent
+        :rtype: str or bool
+        '''
+        song_id = song_details.get('id')
+        linked = self.link(song_id, bitrate, floc)
+        if linked:
+            return linked
+
+        url = (song_details.get('download_links') or {}).get(f'{bitrate}kbps')
+        if not url:
+            return False
+        self.add(song_id, bitrate, url, transport)
+
+        return self.link(song_id, bitrate, floc)
+
+    def verify(self, song_id: str, bitrate: str) -> bool:
+        '''Verifies song checksum, removes song from the store if checksum
+        does not match
+
+        :param song_id: str value, song id
+        :param bitrate: str value, bitrate of the song
+
+        :return: True if song is present and valid else False
+        :rtype: bool
+        '''
+        key = self.create_key(song_id, bitrate)
+        if not self.has(song_id, bitrate):
+            return False
+
+        entry = self._index.get(key)
+        is_valid = self.checksum(entry['floc']) == entry['sha256']
+
+        with self._lock:
+            if is_valid:
+                entry['size'] = getsize(entry['floc'])
+                entry['mtime'] = getmtime(entry['floc'])
+                self._index.set(key, entry)
+            elif self._index.get(key) is entry:
+                self.__remove(key)
+
+        return is_valid
+
+    def flush(self):
+        '''Saves pending index changes, i.e. added songs, aliases and song
+        access times, to file'''
+        with self._lock:
+            self._index.save()
+            self._unsaved = 0
+
+    def size(self) -> int:
+        '''Returns total size of songs in the store
+
+        :return: size in bytes
+        :rtype: int
+        '''
+        return sum(entry['size'] for _, entry in self.__entries())
+
+    def evict(self, keep: str = None):
+        '''Removes least recently used songs until store size is under quota
+
+        :param keep: str value, index key which should not be removed
+        '''
+        if self.quota is None:
+            return
+
+        with self._lock:
+            entries = sorted(self.__entries(), key=lambda item: item[1]['last_access'])
+            total = sum(entry['size'] for _, entry in entries)
+            for key, entry in entries:
+                if total <= self.quota:
+                    break
+                if key == keep:
+                    continue
+                self.__remove(key)
+                total -= entry['size']
+
+    @staticmethod
+    def checksum(floc: str) -> str:
+        '''Calculates sha256 checksum of the file
+
+        :param floc: str value, file location
+
+        :return: hex digest of the file
+        :rtype: str
+        '''
+        digest = sha256()
+        with open(floc, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def __download(url: str, floc: str, transport=None):
+        '''Downloads file from url to floc using transport if passed, else
+        using wget'''
+        if transport is None:
+            wget.download(url, out=floc, bar=False)
+            return
+
+        with transport.request('GET', url, stream=True) as res:
+            res.raise_for_status()
+            with open(floc, 'wb') as f:
+                for chunk in res.iter_content(chunk_size=1024 * 1024):
+                    f.write(chunk)
+
+    def __mark_unsaved(self):
+        '''Counts unsaved index change, saves index every `flush_every`
+        changes. Must be called with store lock held'''
+        self._unsaved += 1
+        if self._unsaved >= self.flush_every:
+            self.flush()
+
+    def __entries(self) -> list:
+        '''Returns list of (key, entry) tuples of stored songs'''
+        return [(key, self._index.get(key)) for key in self._index.keys() if key.startswith('song:')]
+
+    def __remove(self, key: str):
+        '''Removes song file and its index entry'''
+        entry = self._index.get(key)
+        if entry and lexists(entry['floc']):
+            remove(entry['floc'])
+        self._index.delete(key)
@@ -0,0 +1,167 @@
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
+from threading import Lock
+
+from requests import Session
+from requests.adapters import HTTPAdapter
+
+
+class BitrateProber:
+    ''':class:`BitrateProber` checks which generated download links are
+    available by sending concurrent HEAD requests over pooled connections.
+    Results are cached per song id, results with unknown availability
+    (timeouts, connection and server errors) are not cached. Prober can be
+    used as a context manager, threads are stopped on exit.
+
+    :param workers: int value, number of concurrent requests, default value 16
+    :param timeout: int or float value, request timeout in seconds, default
+    value 10
+    :param session: `requests.Session` object used to send requests. If
+    `None`, new session is created
+    :param transport: :class:`musicapy.saavn_api.endpoint.Transport` object,
+    e.g. `api.transport`. If passed, requests are sent using its sessions,
+    timeout and concurrency limit, and `session` is ignored
+    '''
+
+    def __init__(self, workers: int = 16, timeout: float = 10, session: Session = None,
+                 transport=None):
+        self.workers = workers
+        self.timeout = timeout
+        self.transport = transport
+
+        if session is None and transport is None:
+            session = Session()
+            adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+        self.session = session
+
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._cache = {}
+        self._lock = Lock()
+
+    def check_link(self, url: str) -> int or bool or None:
+        '''Sends HEAD request to the download link
+
+        :param url: str value, download link
+
+        :return: content length of the file if link is available (0 if
+        length is unknown), False if link is not available (404/403) and None
+        if availability is unknown, e.g. on timeout or server error
+        :rtype: int or bool or None
+        '''
+        try:
+            if self.transport is not None:
+                res = self.transport.request('HEAD', url, allow_redirects=True)
+            else:
+                res = self.session.head(url, timeout=self.timeout, allow_redirects=True)
+        except Exception:
+            return None
+
+        if 200 <= res.status_code < 300:
+            return int(res.headers.get('Content-Length', 0))
+
+        if res.status_code in (403, 404):
+            return False
+
+        return None
+
+    def probe(self, download_links: dict, song_id: str = None) -> dict:
+        '''Returns only available download links along with content length
+
+        :param download_links: dict of bitrate as key and download link as
+        value generated using `Utils.generate_download_links`
+        :param song_id: str value, song id used as cache key. If `None`,
+        results are not cached
+
+        :return: dict of bitrate as key and dict containing `url` and
+        `content_length` as value, i.e., { bitrate : {url, content_length} }
+        :rtype: dict
+        '''
+        if song_id is not None:
+            with self._lock:
+                if song_id in self._cache:
+                    return deepcopy(self._cache[song_id])
+
+        bitrates = list(download_links.keys())
+        lengths = self._executor.map(self.check_link, download_links.values())
+
+        available = {}
+        is_definitive = True
+        for bitrate, length in zip(bitrates, lengths):
+            if length is None:
+                is_definitive = False
+            elif length is not False:
+                available[bitrate] = {
+                    'url': download_links[bitrate],
+                    'content_length': length,
+                }
+
+        # results with unknown availability are not cached, so they are
+        # probed again
+        if song_id is not None and is_definitive:
+            with self._lock:
+                self._cache[song_id] = deepcopy(available)
+
+        return available
+
+    def probe_songs(self, songs: list) -> list:
+        '''Probes download links of multiple songs concurrently
+
+        :param songs: list of song details dicts containing `id` and
+        `download_links` keys
+
+        :return: list of available download links dicts, see
+        :meth:`BitrateProber.probe`
+        :rtype: list
+        '''
+        # flatten all links, so that links of all songs are checked together
+        pending = []
+        results = [None] * len(songs)
+        for pos, song in enumerate(songs):
+            song_id = song.get('id')
+            with self._lock:
+                cached = self._cache.get(song_id) if song_id is not None else None
+
+            if cached is not None:
+                results[pos] = deepcopy(cached)
+                continue
+
+            for bitrate, url in (song.get('download_links') or {}).items():
+                pending.append((pos, bitrate, url))
+
+        lengths = self._executor.map(self.check_link, [url for _, _, url in pending])
+
+        for pos in range(len(songs)):
+            if results[pos] is None:
+                results[pos] = {}
+
+        unknown = set()
+        for (pos, bitrate, url), length in zip(pending, lengths):
+            if length is None:
+                unknown.add(pos)
+            elif length is not False:
+                results[pos][bitrate] = {'url': url, 'content_length': length}
+
+        for pos, song in enumerate(songs):
+            song_id = song.get('id')
+            if song_id is not None and pos not in unknown:
+                with self._lock:
+                    self._cache.setdefault(song_id, deepcopy(results[pos]))
+
+        return results
+
+    def clear_cache(self):
+        '''Removes all cached probe results'''
+        with self._lock:
+            self._cache.clear()
+
+    def close(self):
+        '''Stops prober threads, prober cannot be used after closing'''
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
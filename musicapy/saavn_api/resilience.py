@@ -0,0 +1,144 @@
+from collections import deque
+from threading import Lock
+from time import monotonic
+
+
+class CircuitOpenError(Exception):
+    '''Raised when request is rejected because circuit breaker of the api
+    type is open, i.e. upstream is unhealthy'''
+
+    def __init__(self, api_type: str, retry_after: float):
+        self.api_type = api_type
+        self.retry_after = retry_after
+        super().__init__(
+            f'circuit breaker for {api_type} is open, upstream is unhealthy. '
+            f'Retry after {retry_after:.1f} seconds')
+
+
+class CircuitBreaker:
+    ''':class:`CircuitBreaker` rejects requests after consecutive failures
+    until recovery timeout passes, after that a single trial request is
+    allowed. Breaker is closed again if the trial request succeeds.
+
+    :param api_type: str value, api type guarded by the breaker
+    :param failure_threshold: int value, number of consecutive failures
+    after which breaker is opened, default value 5
+    :param recovery_timeout: int or float value, seconds for which breaker
+    stays open, default value 30
+    '''
+
+    def __init__(self, api_type: str, failure_threshold: int = 5,
+                 recovery_timeout: float = 30):
+        self.api_type = api_type
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+
+        self._lock = Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+
+    def before_request(self):
+        '''Checks whether request is allowed
+
+        :raises CircuitOpenError: if breaker is open
+        '''
+        with self._lock:
+            if self._opened_at is None:
+                return
+
+            retry_after = self._opened_at + self.recovery_timeout - monotonic()
+            if retry_after > 0 or self._trial_running:
+                raise CircuitOpenError(self.api_type, max(retry_after, 0))
+
+            # allow single trial request
+            self._trial_running = True
+
+    def record_success(self):
+        '''Records successful request and closes the breaker'''
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        '''Records failed request and opens the breaker if failure threshold
+        is reached'''
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or self._failures >= self.failure_threshold:
+                self._opened_at = monotonic()
+            self._trial_running = False
+
+
+class LatencyTracker:
+    ''':class:`LatencyTracker` keeps latencies of recent requests
+
+    :param window: int value, number of recent latencies kept, default value
+    200
+    :param min_samples: int value, minimum number of latencies required to
+    calculate percentile, default value 20
+    '''
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._latencies = deque(maxlen=window)
+        self._lock = Lock()
+
+    def add(self, latency: float):
+        '''Adds request latency
+
+        :param latency: float value, latency in seconds
+        '''
+        with self._lock:
+            self._latencies.append(latency)
+
+    def percentile(self, percent: float) -> float or None:
+        '''Calculates latency percentile of recent requests
+
+        :param percent: int or float value between 0 and 100
+
+        :return: latency in seconds, None if there are not enough samples
+        :rtype: float or None
+        '''
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return None
+            latencies = sorted(self._latencies)
+
+        pos = min(int(len(latencies) * percent / 100), len(latencies) - 1)
+        return latencies[pos]
+
+
+class HedgingBudget:
+    ''':class:`HedgingBudget` limits hedged requests to a ratio of all
+    requests, so hedging can not multiply upstream load.
+
+    :param ratio: float value, max ratio of hedged requests, default value
+    0.1, i.e. at most 1 hedged request per 10 requests
+    :param burst: int value, max number of hedged requests allowed at once,
+    default value 10
+    '''
+
+    def __init__(self, ratio: float = 0.1, burst: int = 10):
+        self.ratio = ratio
+        self.burst = burst
+        self._tokens = 0.0
+        self._lock = Lock()
+
+    def record_request(self):
+        '''Records request, every request earns `ratio` hedging tokens'''
+        with self._lock:
+            self._tokens = min(self._tokens + self.ratio, self.burst)
+
+    def try_acquire(self) -> bool:
+        '''Tries to take token for hedged request
+
+        :return: True if hedged request is allowed else False
+        :rtype: bool
+        '''
+        with self._lock:
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
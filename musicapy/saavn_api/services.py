@@ -1,20 +1,61 @@
+from functools import update_wrapper
+from hashlib import sha1
 from json import loads as load_JSON
-from requests import get as GET
+from threading import Lock
+from types import MethodType
 
 from . import config
-from .endpoint import get_data, get_endpoint
+from .endpoint import default_transport
 from .utils import Utils
 
 
 import wget
 
 
+_default_client = None
+_default_client_lock = Lock()
+
+
+def get_default_client():
+    '''Returns client used when services are called on the class instead of
+    an instance, e.g. `SongService.get_trending()`. Default client uses
+    `endpoint.default_transport` which reads settings from :mod:`config`.
+
+    :return: default client
+    :rtype: musicapy.saavn_api.api.SaavnAPI
+    '''
+    global _default_client
+    if _default_client is None:
+        with _default_client_lock:
+            if _default_client is None:
+                from .api import SaavnAPI
+                _default_client = SaavnAPI(transport=default_transport)
+    return _default_client
+
+
+class clientmethod:
+    '''Decorator for service methods. Method called on a client instance
+    receives the instance as `self` and uses its transport. Method called on
+    the class, or on an instance without transport, receives the default
+    client, so static style calls like `SongService.get_trending()` keep
+    working.'''
+
+    def __init__(self, func):
+        self.__func__ = func
+        update_wrapper(self, func)
+
+    def __get__(self, instance, owner=None):
+        if getattr(instance, 'transport', None) is None:
+            instance = get_default_client()
+        return MethodType(self.__func__, instance)
+
+
 class SearchService:
     ''':class:`SearchService` used to search for songs based on albums or song
     name or all. Contains implemented to search for songs and albums, returns
     data in json format as python dict.'''
-    @staticmethod
-    def search_song(song_query: str, page: int = 1,
+    @clientmethod
+    def search_song(self, song_query: str, page: int = 1,
                     limit: int = 20) -> dict or bool:
         '''Searchs for songs using song name and returns data based on passed
         arguments
@@ -27,11 +68,11 @@ class SearchService:
         :rtype: dict or bool
 
         '''
-        return get_data('searchSong', params={'q': song_query,
+        return self.transport.get_data('searchSong', params={'q': song_query,
                                               'page': page, 'limit': limit})
 
-    @staticmethod
-    def search_album(album_query: str, page: int = 1,
+    @clientmethod
+    def search_album(self, album_query: str, page: int = 1,
                      limit: int = 20) -> dict or bool:
         '''Search for albums
 
@@ -43,11 +84,11 @@ class SearchService:
         containing dict
         :rtype: dict or bool
         '''
-        return get_data('searchAlbum', params={'q': album_query,
+        return self.transport.get_data('searchAlbum', params={'q': album_query,
                                                'page': page, 'limit': limit})
 
-    @staticmethod
-    def search_all(query: str) -> dict or bool:
+    @clientmethod
+    def search_all(self, query: str) -> dict or bool:
         '''Search for songs and albums
 
         :param query: str containing query (artist, song or album name)
@@ -55,14 +96,30 @@ class SearchService:
         :return: returns dict if no error occurs else returns False
         :rtype: dict or bool
         '''
-        return get_data('searchAlbum', params={'q': query})
+        return self.transport.get_data('searchAlbum', params={'q': query})
+
+    @clientmethod
+    def search_artist(self, artist_query: str, page: int = 1,
+                      limit: int = 20) -> dict or bool:
+        '''Search for artists
+
+        :param artist_query: str containing artist name
+        :param page: int value containing page number
+        :param limit: int value representing number of results on a single page
+
+        :return: False if anything goes wrong else returns python dict
+        containing data
+        :rtype: dict or bool
+        '''
+        return self.transport.get_data('searchArtist', params={'q': artist_query,
+                                                'page': page, 'limit': limit})
 
 
 class SongService:
     ''':class:`SongService` class wraps various JioSaavn API functions such as
     extracting song id, encrypted url, get trending songs, charts, etc.'''
-    @staticmethod
-    def get_song_details(identifier: dict, use_v4=False) -> dict or bool:
+    @clientmethod
+    def get_song_details(self, identifier: dict, use_v4=False) -> dict or bool:
         '''Get song details using identifier
 
         :param identifier: dictionary containing `type` and `value` as keys
@@ -84,7 +141,7 @@ class SongService:
         # generate params
         param = {'token' if is_by_link else 'albumid': identifier['value']}
 
-        song_details = get_data(api_type, param, use_v4)
+        song_details = self.transport.get_data(api_type, param, use_v4)
         
         if song_details:
             song_details = song_details.get('songs')[0]
@@ -99,22 +156,29 @@ class SongService:
 
         return song_details
 
-    @staticmethod
-    def generate_song_download_links(identifier: dict):
-        '''static method of :class:`SongService` Generates download links for
+    @clientmethod
+    def generate_song_download_links(self, identifier: dict, prober=None):
+        '''Generates download links for
         song in various bitrate formats using identifier from JioSaavn API.
 
         :param identifier: dictionary containing `type` and `value` as keys
         containing type(id or link) and its value(pids or token) respectively
         for JioSaavn API.
+        :param prober: :class:`musicapy.saavn_api.probe.BitrateProber` object.
+        If passed, returns only available bitrates along with their content
+        length, default value `None`
 
         :return: returns a dictionary containing song auth url, file type and
         status if error occurs then returns False
         :rtype: dict | bool
         '''
         # does not work with API version 4
-        song_details = SongService.get_song_details(identifier, use_v4=False)
+        song_details = self.get_song_details(identifier, use_v4=False)
         
+        if song_details and prober is not None:
+            return prober.probe(song_details.get('download_links') or {},
+                                song_details.get('id'))
+
         if song_details:
             return song_details.get(
                 'download_links',
@@ -123,9 +187,9 @@ class SongService:
 
         return False
 
-    @staticmethod
-    def get_song_link(identifier: dict, bitrate: str = '320') -> dict or bool:
-        '''static method of :class:`SongService` Generates link for song using
+    @clientmethod
+    def get_song_link(self, identifier: dict, bitrate: str = '320') -> dict or bool:
+        '''Generates link for song using
         identifier from JioSaavn API.
 
         :param identifier: dictionary containing `type` and `value` as keys
@@ -137,7 +201,7 @@ class SongService:
         status if error occurs then returns False
         :rtype: dict | bool
         '''
-        data = SongService.get_song_details(identifier)
+        data = self.get_song_details(identifier)
 
         # extract encrypted media url
         enc_media_url = None
@@ -147,9 +211,9 @@ class SongService:
             enc_media_url = ['songs'][0]['more_info']['encrypted_media_url']
 
         # generate auth token
-        endpoint = get_endpoint(config.api_types['songAuthToken'])
+        endpoint = self.transport.get_endpoint(config.api_types['songAuthToken'])
         param = {'url': enc_media_url, 'bitrate': bitrate}
-        res = GET(endpoint, params=param)
+        res = self.transport.send_request(endpoint, param)
 
         if res.status_code == 200:
             data = load_JSON(res.text.encode().decode('utf-8'))
@@ -157,8 +221,8 @@ class SongService:
             return False
         return data
 
-    @staticmethod
-    def get_song_id(identifier: dict) -> str or bool:
+    @clientmethod
+    def get_song_id(self, identifier: dict) -> str or bool:
         '''Retreives Song Main Id which is used to get lyrics
 
         :param identifier: dictionary containing `type` and `value` as keys
@@ -168,29 +232,29 @@ class SongService:
         :return: Song Id as str if id found else False
         :rtype: str or bool
         '''
-        data = SongService.get_song_details(identifier)
+        data = self.get_song_details(identifier)
         return data['songs'][0].get('id', False)
 
-    @staticmethod
-    def get_trending() -> dict or bool:
+    @clientmethod
+    def get_trending(self) -> dict or bool:
         '''Get trending songs list as json data in form of dict
 
         :return: dict containing trending songs list
         :rtype: None or dict
         '''
-        return get_data(api_type='trending')
+        return self.transport.get_data(api_type='trending')
 
-    @staticmethod
-    def get_charts() -> dict or bool:
+    @clientmethod
+    def get_charts(self) -> dict or bool:
         '''Get song charts list as json data in form of dict
 
         :return: dict containing charts
         :rtype: None or dict
         '''
-        return get_data(api_type='charts')
+        return self.transport.get_data(api_type='charts')
 
-    @staticmethod
-    def get_song_lyrics(identifier: dict) -> str or bool:
+    @clientmethod
+    def get_song_lyrics(self, identifier: dict) -> str or bool:
         '''Get song lyrics
 
         :param identifier: dictionary containing `type` and `value` as keys
@@ -201,12 +265,12 @@ class SongService:
         :rtype: dict or bool
         '''
         # get song id
-        id = SongService.get_song_id(identifier)
+        id = self.get_song_id(identifier)
         if not id:
             return False
 
         # get lyrics
-        lyrics = get_data(
+        lyrics = self.transport.get_data(
             'lyrics', {'lyrics_id': id}).get('lyrics', False)
         if not lyrics:
             return False
@@ -217,8 +281,8 @@ class SongService:
 
         return lyrics
 
-    @staticmethod
-    def save_song(identifier: dict, floc: str, bitrate: str = '320'):
+    @clientmethod
+    def save_song(self, identifier: dict, floc: str, bitrate: str = '320', store=None):
         '''Saves song to local machine using identifier
 
         :param identifier: dictionary containing `type` and `value` as keys
@@ -227,11 +291,29 @@ class SongService:
         :param floc: str value, containing downloaded file location
         :param  bitrate: str value, bitrate of the song, default value 320,
         i.e., 320 kbps
+        :param store: :class:`musicapy.saavn_api.media.MediaStore` object. If
+        passed, song is downloaded using client transport only if it is absent
+        in the store and linked to floc, default value `None`
 
-        :return: dict containing trending songs list
-        :rtype: dict
+        :return: location of the downloaded file, if error occurs returns
+        False
+        :rtype: str or bool
         '''
-        download_url = SongService.get_song_link(identifier, bitrate)
+        if store is not None:
+            # song is already present, skip network calls
+            song_id = store.get_song_id(identifier)
+            linked = store.link(song_id, bitrate, floc) if song_id else False
+            if linked:
+                return linked
+
+            song_details = self.get_song_details(identifier)
+            if not song_details:
+                return False
+
+            store.add_alias(identifier, song_details.get('id'))
+            return store.save(song_details, floc, bitrate, self.transport)
+
+        download_url = self.get_song_link(identifier, bitrate)
         result = wget.download(download_url['auth_url'], out=floc, bar=False)
         return result
 
@@ -240,11 +322,14 @@ class AlbumService:
     ''':class:`AlbumService` class provides JioSaavn API wrapper class to
     perform operations on albums'''
 
-    @staticmethod
-    def get_album_details(identifier: dict) -> dict or bool:
+    @clientmethod
+    def get_album_details(self, identifier: dict, fetch_songs: bool = True) -> dict or bool:
         '''Fetches album details and returns it as dict
 
         :param identifier: dict, containing identifier type and its value.
+        :param fetch_songs: bool value. If False, songs details are not
+        fetched and `songs` contains songs as listed in album, default value
+        `True`
 
         :return: returns album details as dict, if error occurs returns False
         :rtype: dict or bool
@@ -259,14 +344,14 @@ class AlbumService:
             api_type = 'albumDetails'
             param = {'albumid': id_value}
 
-        album_details = get_data(api_type, param, use_v4=False)
+        album_details = self.transport.get_data(api_type, param, use_v4=False)
 
-        if album_details:
+        if album_details and fetch_songs:
             songs_details = []
             for song in album_details.get('songs',[]):
                 perma_url = song.get('perma_url')
                 song_identifier = Utils.create_identifier(perma_url, 'song')
-                song_details = SongService.get_song_details(song_identifier, use_v4=False)
+                song_details = self.get_song_details(song_identifier, use_v4=False)
                 songs_details.append(song_details)
                 
             album_details['songs'] = songs_details
@@ -274,8 +359,8 @@ class AlbumService:
         # make get request and return data
         return album_details
 
-    @staticmethod
-    def generate_album_download_links(identfier: dict) -> dict or bool:
+    @clientmethod
+    def generate_album_download_links(self, identfier: dict) -> dict or bool:
         '''Generates album song download links and returns it as dict
 
         :param identifier: dictionary containing `type` and `value` as keys
@@ -286,7 +371,7 @@ class AlbumService:
         error occurs returns False
         :rtype: dict or bool
         '''
-        album_details = AlbumService.get_album_details(identfier)
+        album_details = self.get_album_details(identfier)
 
         data = {
             "album_id": album_details.get('albumid', False),
@@ -302,13 +387,61 @@ class AlbumService:
 
         return data
 
+    @clientmethod
+    def get_new_albums(self, page: int = 1, limit: int = 50) -> dict or bool:
+        '''Fetches new released albums, latest albums are returned first
+
+        :param page: int value containing page number, starts from 1
+        :param limit: int value representing number of albums on a single
+        page
+
+        :return: returns dict containing new albums, if error occurs returns
+        False
+        :rtype: dict or bool
+        '''
+        return self.transport.get_data('albums', {'p': page, 'n': limit})
+
+
+class ArtistService:
+    ''':class:`ArtistService` class provides JioSaavn API wrapper class to
+    perform operations on artists'''
+
+    @clientmethod
+    def get_artist_details(self, identifier: dict, page: int = 0, n_album: int = 50,
+                           n_song: int = 0) -> dict or bool:
+        '''Fetches artist details along with artist albums and top songs
+
+        :param identifier: dictionary containing `type` and `value` as keys
+        containing type(id or link) and its value(artist id or token)
+        respectively for JioSaavn API.
+        :param page: int value containing page number, starts from 0
+        :param n_album: int value, number of albums on a single page
+        :param n_song: int value, number of top songs on a single page
+
+        :return: returns artist details as dict, if error occurs returns False
+        :rtype: dict or bool
+        '''
+        id_type = identifier.get('type')
+        id_value = identifier.get('value')
+
+        param = {'page': page, 'p': page, 'n_album': n_album, 'n_song': n_song,
+                 'category': 'latest', 'sort_order': 'desc'}
+        if id_type == 'link':
+            api_type = 'artistDetailsByLink'
+            param['token'] = id_value
+        else:
+            api_type = 'artistDetails'
+            param['artistId'] = id_value
+
+        return self.transport.get_data(api_type, param)
+
 
 class PlaylistService:
     ''':class:`PlaylistService` class provides JioSaavn API wrapper class to
     perform operations on playlists'''
 
-    @staticmethod
-    def get_playlist_details(identifier):
+    @clientmethod
+    def get_playlist_details(self, identifier):
         '''Fetches Playlist details returns it as dict
 
         :param identifier: dictionary containing `type` and `value` as keys
@@ -319,41 +452,24 @@ class PlaylistService:
         :rtype: dict
         '''
         id_type = identifier.get('type')
-        id_value = identifier.get('value')
-
-        playlist_details = None
-        if id_type == 'link':
-            api_type = 'playlistDetailsByLink'
-            param = {
-                'token': id_value,
-                'n':9999 # number of songs ## temporary fix instead of using pagination
-                # 'p' : 1 ## TODO: for pagination
-            }
-            use_v4 = False
-            
-        elif id_type == 'id':
-            api_type = 'playlistDetails'
-            param = {'listid': id_value}
-            use_v4 = True
-
-        playlist_details = get_data(api_type, param, use_v4)
+        playlist_details = self.__get_playlist_data(identifier)
 
         if not playlist_details:
             return None
         
         # add download links to songs
         if id_type == 'link':
-            song_details = PlaylistService.__get_playlist_song_download_links_by_link(playlist_details)
+            song_details = self.__get_playlist_song_download_links_by_link(playlist_details)
         elif id_type == 'id':
-            song_details = PlaylistService.__get_playlist_song_download_links_by_id(playlist_details)
+            song_details = self.__get_playlist_song_download_links_by_id(playlist_details)
 
         playlist_details['songs'] = song_details
 
         return playlist_details
 
 
-    @staticmethod
-    def get_playlist_song_download_links(identifier):
+    @clientmethod
+    def get_playlist_song_download_links(self, identifier):
         '''Fetches Songs details from a playlist with download links and 
         returns it as dict
 
@@ -365,12 +481,134 @@ class PlaylistService:
         error occurs returns False
         :rtype: dict or bool
         '''
-        res = PlaylistService.get_playlist_details(identifier)
+        res = self.get_playlist_details(identifier)
 
         if not res:
             return None
         
         return res.get('songs', None)
+
+    @clientmethod
+    def sync_playlist(self, identifier: dict, store) -> dict or bool:
+        '''Fetches playlist track list and compares it with the last seen
+        snapshot saved in store. Song details are fetched only for newly added
+        songs, and the new snapshot (track ids and content hash) is saved to
+        the store.
+
+        :param identifier: dictionary containing `type` and `value` as keys
+        containing type(id or link) and its value(pids or token) respectively
+        for JioSaavn API.
+        :param store: :class:`musicapy.saavn_api.state.JSONStateStore` object
+        or any object with `get` and `set` methods used to save snapshots
+
+        :return: returns dict containing `playlist_id`, `changed`, `hash`,
+        `added` (song details with download links), `removed` (song ids),
+        `reordered` (song ids with old and new position) and `failed` (ids of
+        added songs whose details could not be fetched, retried on next
+        sync), if error occurs returns False
+        :rtype: dict or bool
+        '''
+        id_type = identifier.get('type')
+        playlist_details = self.__get_playlist_data(identifier)
+
+        if not playlist_details:
+            return False
+
+        songs = playlist_details.get('songs' if id_type == 'link' else 'list', []) or []
+        song_ids = [song.get('id') for song in songs]
+        content_hash = sha1('|'.join(map(str, song_ids)).encode()).hexdigest()
+
+        snapshot_key = f'playlist:{id_type}:{identifier.get("value")}'
+        snapshot = store.get(snapshot_key) or {'ids': [], 'hash': None}
+
+        diff = {
+            'playlist_id': identifier.get('value'),
+            'changed': snapshot['hash'] != content_hash,
+            'hash': content_hash,
+            'added': [],
+            'removed': [],
+            'reordered': [],
+            'failed': [],
+        }
+        if not diff['changed']:
+            return diff
+
+        old_ids = snapshot['ids']
+        old_ids_set = set(old_ids)
+        new_ids_set = set(song_ids)
+
+        # fetch details only for new songs
+        new_songs = [song for song in songs if song.get('id') not in old_ids_set]
+        if id_type == 'link':
+            new_details = self.__get_playlist_song_download_links_by_link({'songs': new_songs})
+        else:
+            new_details = self.__get_playlist_song_download_links_by_id({'list': new_songs})
+
+        failed_ids = set()
+        for song, song_details in zip(new_songs, new_details):
+            if song_details:
+                diff['added'].append(song_details)
+            else:
+                failed_ids.add(song.get('id'))
+        diff['failed'] = [song_id for song_id in song_ids if song_id in failed_ids]
+
+        diff['removed'] = [song_id for song_id in old_ids if song_id not in new_ids_set]
+
+        # songs present in both snapshots which keep their relative order form
+        # the longest increasing subsequence of old positions, rest are moved
+        old_positions = {song_id: pos for pos, song_id in enumerate(old_ids)}
+        new_positions = {song_id: pos for pos, song_id in enumerate(song_ids)}
+        new_common = [song_id for song_id in song_ids if song_id in old_ids_set]
+        kept = Utils.longest_increasing_subsequence(
+            [old_positions[song_id] for song_id in new_common])
+        for pos, song_id in enumerate(new_common):
+            if pos not in kept:
+                diff['reordered'].append({
+                    'id': song_id,
+                    'from': old_positions[song_id],
+                    'to': new_positions[song_id],
+                })
+
+        # songs whose details could not be fetched are left out of the
+        # snapshot, so they are reported as added on the next sync
+        if failed_ids:
+            saved_ids = [song_id for song_id in song_ids if song_id not in failed_ids]
+            saved_hash = sha1('|'.join(map(str, saved_ids)).encode()).hexdigest()
+        else:
+            saved_ids, saved_hash = song_ids, content_hash
+        store.set(snapshot_key, {'ids': saved_ids, 'hash': saved_hash})
+
+        return diff
+
+    @clientmethod
+    def __get_playlist_data(self, identifier: dict) -> dict or bool:
+        '''Fetches raw playlist data (without song details) from API
+
+        :param identifier: dictionary containing `type` and `value` as keys
+        containing type(id or link) and its value(pids or token) respectively
+        for JioSaavn API.
+
+        :return: returns playlist data as dict, if error occurs returns False
+        :rtype: dict or bool
+        '''
+        id_type = identifier.get('type')
+        id_value = identifier.get('value')
+
+        if id_type == 'link':
+            api_type = 'playlistDetailsByLink'
+            param = {
+                'token': id_value,
+                'n':9999 # number of songs ## temporary fix instead of using pagination
+                # 'p' : 1 ## TODO: for pagination
+            }
+            use_v4 = False
+            
+        elif id_type == 'id':
+            api_type = 'playlistDetails'
+            param = {'listid': id_value}
+            use_v4 = True
+
+        return self.transport.get_data(api_type, param, use_v4)
     
     @staticmethod
     def __get_playlist_song_download_links_by_link(playlist_details:dict) -> dict:
@@ -384,15 +622,15 @@ class PlaylistService:
         :rtype: dict or bool
         '''
         song_details = playlist_details.get('songs', {})
-        for song in song_details:
-            preview_link = song.get('media_preview_url', False)
-            download_links = Utils.generate_download_links(preview_link) if preview_link else None
-            song['download_links'] = download_links
+        download_links = Utils.generate_bulk_download_links(
+            [song.get('media_preview_url', False) for song in song_details])
+        for song, links in zip(song_details, download_links):
+            song['download_links'] = links
 
         return song_details
     
-    @staticmethod
-    def __get_playlist_song_download_links_by_id(playlist_details:dict) -> list:
+    @clientmethod
+    def __get_playlist_song_download_links_by_id(self, playlist_details:dict) -> list:
         '''Generates song download links using playlist details fetched from API
         using listid and returns it as dict.
 
@@ -409,7 +647,7 @@ class PlaylistService:
         for song in songs_list:
             perma_url = song.get('perma_url')
             song_identifier = Utils.create_identifier(perma_url, 'song')
-            song_details = SongService.get_song_details(song_identifier, use_v4=False)
+            song_details = self.get_song_details(song_identifier, use_v4=False)
             songs_details.append(song_details)
 
         return songs_details
@@ -0,0 +1,81 @@
+from json import dump as dump_JSON, load as load_JSON
+from os import makedirs, replace
+from os.path import abspath, dirname, isfile
+from threading import RLock
+
+
+class JSONStateStore:
+    ''':class:`JSONStateStore` is a small thread safe key-value store which
+    persists JSON serializable values to a file on local machine. Used to
+    remember state between runs, e.g. playlist snapshots.
+
+    :param floc: str value, location of the JSON file. If `None`, state is
+    kept in memory only
+    '''
+
+    def __init__(self, floc: str = None):
+        self.floc = floc
+        self._lock = RLock()
+        self._data = {}
+
+        if floc and isfile(floc):
+            with open(floc, 'r') as f:
+                self._data = load_JSON(f)
+
+    def get(self, key: str, default=None):
+        '''Returns value stored for key
+
+        :param key: str value, key of the stored value
+        :param default: value returned if key is absent
+
+        :return: stored value or default
+        '''
+        with self._lock:
+            return self._data.get(key, default)
+
+    def set(self, key: str, value, save: bool = True):
+        '''Stores value for key and saves the store to file
+
+        :param key: str value, key of the value
+        :param value: JSON serializable value
+        :param save: bool value. If True writes store to file, default value
+        `True`
+        '''
+        with self._lock:
+            self._data[key] = value
+            if save:
+                self.save()
+
+    def delete(self, key: str, save: bool = True):
+        '''Removes key from the store
+
+        :param key: str value, key to be removed
+        :param save: bool value. If True writes store to file, default value
+        `True`
+        '''
+        with self._lock:
+            self._data.pop(key, None)
+            if save:
+                self.save()
+
+    def keys(self) -> list:
+        '''Returns list of stored keys
+
+        :return: list of keys
+        :rtype: list
+        '''
+        with self._lock:
+            return list(self._data.keys())
+
+    def save(self):
+        '''Atomically writes store to file, does nothing for in memory store'''
+        if not self.floc:
+            return
+
+        with self._lock:
+            floc = abspath(self.floc)
+            makedirs(dirname(floc), exist_ok=True)
+            tmp_floc = f'{floc}.tmp'
+            with open(tmp_floc, 'w') as f:
+                dump_JSON(self._data, f)
+            replace(tmp_floc, floc)
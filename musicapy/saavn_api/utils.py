@@ -1,3 +1,15 @@
+from bisect import bisect_left
+
+
+qualities = [
+    ('_12', '12kbps'),
+    ('_48', '48kbps'),
+    ('_96', '96kbps'),
+    ('_160', '160kbps'),
+    ('_320', '320kbps')
+]
+
+
 class Utils:
     @staticmethod
     def create_identifier(identifier: str or int, identifier_type: str = 'song' or 'album' or'playlist'):
@@ -40,6 +52,22 @@ class Utils:
         except AttributeError:
             raise TypeError('link should be of type str object.')
 
+    @staticmethod
+    def create_download_link_template(preview_url: str,
+                                      preview_bitrate: str = '_96_p') -> list:
+        '''Creates download link template from preview url, template is
+        joined with bitrate id to create download link
+
+        :param preview_url: str value containing song preview URL
+        :param preview_bitrate: str value containing preview bit rate, default
+        value is `_96_p`
+
+        :return: returns list of URL parts split at preview bitrate
+        :rtype: list
+        '''
+        return preview_url.replace(
+            'preview.saavncdn.com', 'aac.saavncdn.com').split(preview_bitrate)
+
     @staticmethod
     def generate_download_links(preview_url: str,
                                 preview_bitrate: str = '_96_p') -> dict:
@@ -54,20 +82,36 @@ class Utils:
         URLs, i.e., { bitrate : download_link}
         :rtype: dict
         '''
-        qualities = [
-            ('_12', '12kbps'),
-            ('_48', '48kbps'),
-            ('_96', '96kbps'),
-            ('_160', '160kbps'),
-            ('_320', '320kbps')
-        ]
-        links = dict()
-        for quality in qualities:
-            _id, bitrate = quality
-            download_link = preview_url.replace(
-                'preview.saavncdn.com',
-                'aac.saavncdn.com').replace(preview_bitrate, _id)
-            links[bitrate] = download_link
+        template = Utils.create_download_link_template(preview_url, preview_bitrate)
+        return {bitrate: _id.join(template) for _id, bitrate in qualities}
+
+    @staticmethod
+    def generate_bulk_download_links(preview_urls: list,
+                                     preview_bitrate: str = '_96_p') -> list:
+        '''Generates download links for multiple preview urls. Templates are
+        created once per preview url.
+
+        :param preview_urls: list of str values containing song preview URLs
+        :param preview_bitrate: str value containing preview bit rate, default
+        value is `_96_p`
+
+        :return: returns list of dictionaries of bitrate as key and download
+        link as URLs, None for empty preview urls
+        :rtype: list
+        '''
+        templates = {}
+        links = []
+        for preview_url in preview_urls:
+            if not preview_url:
+                links.append(None)
+                continue
+
+            template = templates.get(preview_url)
+            if template is None:
+                template = Utils.create_download_link_template(preview_url, preview_bitrate)
+                templates[preview_url] = template
+
+            links.append({bitrate: _id.join(template) for _id, bitrate in qualities})
 
         return links
 
@@ -82,17 +126,48 @@ class Utils:
         occurs returns False
         :rtype: dict or bool
         '''
+        songs = album_details.get('songs', [])
+        download_links = Utils.generate_bulk_download_links(
+            [song.get('media_preview_url', False) for song in songs])
+
         songs_links = []
-        for song in album_details.get('songs', []):
+        for song, links in zip(songs, download_links):
             name = song.get('perma_url', '').split('/song/')[-1].split('/')[0]
-            preview_link = song.get('media_preview_url', False)
             image = song.get('image', False)
             songs_links.append(
-                {"song": name, "image": image,
-                 "links": Utils.generate_download_links(preview_link)})
+                {"song": name, "image": image, "links": links})
 
         return songs_links
 
+    @staticmethod
+    def longest_increasing_subsequence(values: list) -> set:
+        '''Finds longest strictly increasing subsequence of values
+
+        :param values: list of comparable values, e.g. int positions
+
+        :return: set of indexes of values which are part of the subsequence
+        :rtype: set
+        '''
+        tail_values = []    # smallest tail value of subsequence of each length
+        tails = []          # index of the tail value
+        previous = []       # index of previous value in subsequence
+        for pos, value in enumerate(values):
+            length = bisect_left(tail_values, value)
+            previous.append(tails[length - 1] if length else None)
+            if length == len(tails):
+                tail_values.append(value)
+                tails.append(pos)
+            else:
+                tail_values[length] = value
+                tails[length] = pos
+
+        indexes = set()
+        pos = tails[-1] if tails else None
+        while pos is not None:
+            indexes.add(pos)
+            pos = previous[pos]
+        return indexes
+
     @staticmethod
     def remove_unused_keys(api_res):
         '''Removes unused data from the api response